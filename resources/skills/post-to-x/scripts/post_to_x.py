@@ -7,9 +7,14 @@ import asyncio
 import argparse
 import os
 import json
+import re
 from pathlib import Path
+from urllib.parse import urlparse
 from playwright.async_api import async_playwright
 
+# 普通推文走 CreateTweet，长推文走 CreateNoteTweet
+CREATE_TWEET_PATH_RE = re.compile(r"/(CreateTweet|CreateNoteTweet)$")
+
 
 def get_default_browser_user_data_dir() -> str:
     """获取 Windows 系统默认浏览器用户数据目录"""
@@ -46,6 +51,15 @@ def show_login_notification():
         print("="*50 + "\n")
 
 
+async def find_first_selector(page, selectors: list, timeout: float):
+    """等待任一候选元素出现，再按列表优先级返回实际命中的选择器"""
+    await page.wait_for_selector(", ".join(selectors), state="attached", timeout=timeout)
+    for selector in selectors:
+        if await page.query_selector(selector):
+            return selector
+    return None
+
+
 async def post_to_x(content: str, headless: bool = False):
     """发布推文到 X.com"""
     
@@ -73,7 +87,8 @@ async def post_to_x(content: str, headless: bool = False):
             return False
         
         try:
-            page = await browser.new_page()
+            # 持久化上下文启动时自带一个空白页，直接复用
+            page = browser.pages[0] if browser.pages else await browser.new_page()
             
             # 访问 X.com 主页
             print("正在打开 x.com...")
@@ -81,7 +96,6 @@ async def post_to_x(content: str, headless: bool = False):
                 await page.goto("https://x.com", wait_until="domcontentloaded", timeout=60000)
             except:
                 pass
-            await asyncio.sleep(5)
             
             # 检查是否已登录
             print("检查登录状态...")
@@ -92,66 +106,63 @@ async def post_to_x(content: str, headless: bool = False):
                 'a[href="/compose/tweet"]',
             ]
             
+            # 任一标记存在即视为已登录，不要求可见
+            logged_in_selector = ", ".join(logged_in_selectors)
+            
             is_logged_in = False
-            for selector in logged_in_selectors:
-                try:
-                    await page.wait_for_selector(selector, timeout=5000)
-                    is_logged_in = True
-                    print(f"已登录 (找到: {selector})")
-                    break
-                except:
-                    continue
+            try:
+                await page.wait_for_selector(logged_in_selector, state="attached", timeout=10000)
+                is_logged_in = True
+                print("已登录")
+            except:
+                pass
             
             if not is_logged_in:
                 print("未登录，等待用户登录...")
                 show_login_notification()
                 
-                for selector in logged_in_selectors:
-                    try:
-                        await page.wait_for_selector(selector, timeout=300000)
-                        is_logged_in = True
-                        print("登录成功！")
-                        break
-                    except:
-                        continue
-                
-                if not is_logged_in:
+                try:
+                    await page.wait_for_selector(logged_in_selector, state="attached", timeout=300000)
+                    print("登录成功！")
+                except:
                     print("登录超时")
                     return False
             
             # 打开发推界面
             print("打开发推界面...")
+            # 主页本身带有内嵌发推框，后续查找都限定在发推弹窗内
+            compose_dialog = '[role="dialog"]'
             try:
                 tweet_btn = await page.query_selector('[data-testid="SideNav_NewTweet_Button"]')
                 if tweet_btn:
                     await tweet_btn.click()
-                    await asyncio.sleep(2)
                 else:
-                    await page.goto("https://x.com/compose/tweet", wait_until="networkidle")
+                    await page.goto("https://x.com/compose/tweet", wait_until="domcontentloaded")
             except:
-                await page.goto("https://x.com/compose/tweet", wait_until="networkidle")
+                await page.goto("https://x.com/compose/tweet", wait_until="domcontentloaded")
             
-            await asyncio.sleep(3)
+            try:
+                await page.wait_for_selector(f'{compose_dialog} [data-testid="tweetTextarea_0"]', timeout=10000)
+            except:
+                pass
             
             # 找到文本输入框
             print("输入推文内容...")
             text_selectors = [
-                '[data-testid="tweetTextarea_0"]',
-                '[data-testid="tweetTextarea_0RichTextInputContainer"]',
-                'div[contenteditable="true"]',
-                '[aria-label="Tweet text"]',
-                '[aria-label="发推"]',
+                f'{compose_dialog} [data-testid="tweetTextarea_0"]',
+                f'{compose_dialog} [data-testid="tweetTextarea_0RichTextInputContainer"]',
+                f'{compose_dialog} div[contenteditable="true"]',
+                f'{compose_dialog} [aria-label="Tweet text"]',
+                f'{compose_dialog} [aria-label="发推"]',
             ]
             
             text_input = None
-            for selector in text_selectors:
-                try:
-                    text_input = await page.wait_for_selector(selector, timeout=5000)
-                    if text_input:
-                        print(f"找到输入框: {selector}")
-                        break
-                except:
-                    continue
+            try:
+                text_selector = await find_first_selector(page, text_selectors, timeout=5000)
+                if text_selector:
+                    text_input = page.locator(text_selector).first
+            except:
+                pass
             
             if not text_input:
                 print("未找到文本输入框")
@@ -160,47 +171,70 @@ async def post_to_x(content: str, headless: bool = False):
             
             # 输入内容
             await text_input.fill(content)
-            await asyncio.sleep(1)
             
             # 点击发布按钮
             print("点击发布按钮...")
             post_selectors = [
-                '[data-testid="tweetButton"]',
-                '[data-testid="tweetButtonInline"]',
-                'button[data-testid="tweetButton"]',
+                f'{compose_dialog} [data-testid="tweetButton"]',
+                f'{compose_dialog} button[data-testid="tweetButton"]',
             ]
             
-            post_btn = None
-            for selector in post_selectors:
-                post_btn = await page.query_selector(selector)
-                if post_btn:
-                    print(f"找到发布按钮: {selector}")
-                    break
-            
-            if post_btn:
-                is_disabled = await post_btn.get_attribute("disabled")
-                if is_disabled:
-                    print("发布按钮当前不可用，等待...")
-                    await asyncio.sleep(3)
-                
-                # 使用 JavaScript 点击避免元素遮挡
-                try:
-                    await post_btn.evaluate("el => el.click()")
-                except:
-                    await post_btn.click(force=True)
-                
-                print("已点击发布按钮")
-                await asyncio.sleep(5)
-                
-                print("检查发布状态...")
-                await asyncio.sleep(3)
-                
-                print("✅ 推文发布完成！")
-                return True
-            else:
+            post_selector = None
+            try:
+                post_selector = await find_first_selector(page, post_selectors, timeout=5000)
+            except:
+                pass
+            
+            if not post_selector:
                 print("未找到发布按钮")
                 await page.screenshot(path="x_debug.png")
                 return False
+            post_btn = page.locator(post_selector).first
+            
+            # 只等待按钮可用；按钮常被遮挡，因此不做完整的可点击检查
+            try:
+                await page.wait_for_selector(
+                    f'{post_selector}:not([disabled]):not([aria-disabled="true"])',
+                    state="attached",
+                    timeout=3000,
+                )
+            except:
+                print("发布按钮当前不可用，继续尝试点击...")
+            
+            # 以发推接口的返回作为发布结果，代替固定等待
+            clicked = False
+            try:
+                async with page.expect_response(
+                    lambda r: r.request.method == "POST" and CREATE_TWEET_PATH_RE.search(urlparse(r.url).path),
+                    timeout=15000,
+                ) as response_info:
+                    # 使用 JavaScript 点击避免元素遮挡
+                    try:
+                        await post_btn.evaluate("el => el.click()")
+                    except:
+                        await post_btn.click(force=True)
+                    clicked = True
+                    print("已点击发布按钮")
+                    print("检查发布状态...")
+                response = await response_info.value
+            except Exception as e:
+                if clicked:
+                    print("未检测到发布结果")
+                else:
+                    print(f"点击发布按钮失败: {e}")
+                await page.screenshot(path="x_debug.png")
+                return False
+            
+            try:
+                errors = (await response.json()).get("errors")
+            except:
+                errors = None
+            if not response.ok or errors:
+                print(f"发布失败: HTTP {response.status} {errors or ''}")
+                return False
+            
+            print("✅ 推文发布完成！")
+            return True
                 
         except Exception as e:
             print(f"发布失败: {str(e)}")